@@ -19,6 +19,7 @@ import time
 import base64
 import re
 import collections
+import json
 from zipfile import ZipFile
 
 import numpy as np
@@ -34,6 +35,8 @@ from selenium.webdriver import ChromeOptions
 from PIL import Image
 from slugify import slugify
 
+from .asset_index import GoogleArtsAssetIndex, parse_asset_id
+
 WINDOWS = os.name == 'nt'
 LINUX = sys.platform.startswith('linux')
 DARWIN = sys.platform.startswith('darwin')
@@ -72,6 +75,20 @@ DEFAULT_GCO_SIZE = 12000
 DEFAULT_GCO_OUTPUT_PATH = 'output'
 DEFAULT_GCO_PARTIAL_PATH = 'partial'
 DEFAULT_GCO_INIT_DELAY = 5
+# url patterns blocked in lean load mode, `*` is wildcard.
+# the document, viewer scripts/styles and tile requests do not match any of them.
+DEFAULT_GCO_LEAN_LOAD_BLOCKED_URLS = [
+    # fonts
+    '*fonts.googleapis.com*', '*fonts.gstatic.com*', '*.woff', '*.woff2', '*.ttf', '*.otf',
+    # analytics and ads
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*/gen_204*', '*/log?*',
+    # thumbnails of recommendations carousels, tiles are requested as `=x{x}-y{y}-z{z}-t{token}`
+    '*googleusercontent.com/*=w*', '*googleusercontent.com/*=s*',
+    '*.png', '*.gif', '*.svg', '*.ico',
+    # embedded videos and maps
+    '*youtube.com*', '*ytimg.com*', '*maps.googleapis.com*',
+]
 
 
 class GoogleArtsCrawlerOption(object):
@@ -87,6 +104,10 @@ class GoogleArtsCrawlerOption(object):
                  partial_tmp_path: str = DEFAULT_GCO_PARTIAL_PATH,
                  need_download_webdrive: bool = False,
                  need_clear_cache: bool = True,
+                 asset_index_path: str = None,
+                 need_lean_load: bool = False,
+                 lean_load_blocked_urls: list = None,
+                 need_embed_metadata: bool = False,
                  is_debug: bool = False):
         """
         GoogleArtsCrawlerOption
@@ -101,6 +122,9 @@ class GoogleArtsCrawlerOption(object):
                                  .set_output_path("custom_output_dir")
                                  .set_output_filename("custom.jpg")
                                  .set_need_clear_cache(True)
+                                 # .set_asset_index_path("custom_output_dir/index.sqlite")
+                                 # .set_need_lean_load(True)
+                                 # .set_need_embed_metadata(True)
                                  .prepare_options()
         ```
         :param url:                         google arts url.
@@ -114,6 +138,11 @@ class GoogleArtsCrawlerOption(object):
         :param need_download_webdrive       need download webdrive, default False , it will auto download webdrive if set True.
         :param partial_tmp_path:            custom partial tmp path , it will be deleted after finish, default `blob`.
         :param need_clear_cache:            auto clear webdriver download tmp  and partial images after finished.
+        :param asset_index_path:            sqlite asset index, skip assets already downloaded with size >= `size`,
+                                            asset id is appended to output filename.
+        :param need_lean_load:              block fonts, analytics, thumbnails etc. through devtools, default False.
+        :param lean_load_blocked_urls:      url patterns blocked in lean load, None uses `DEFAULT_GCO_LEAN_LOAD_BLOCKED_URLS`.
+        :param need_embed_metadata:         embed asset metadata as XMP into output jpeg, default False.
         :param is_debug:
 
         """
@@ -129,6 +158,10 @@ class GoogleArtsCrawlerOption(object):
         self._is_debug: bool = is_debug
         self._need_download_webdrive = need_download_webdrive
         self._need_clear_cache = need_clear_cache
+        self._asset_index_path = asset_index_path
+        self._need_lean_load = need_lean_load
+        self._lean_load_blocked_urls = lean_load_blocked_urls
+        self._need_embed_metadata = need_embed_metadata
 
         pass
 
@@ -218,6 +251,9 @@ class GoogleArtsCrawlerOption(object):
         self._chrome_options.add_argument("--disable-extensions")
         if not self._is_debug:
             self._chrome_options.add_argument("--headless")
+        if self._need_lean_load:
+            # network events are read back from performance log to report blocked requests
+            self._chrome_options.capabilities['goog:loggingPrefs'] = {'performance': 'ALL'}
 
         self._output_path = DEFAULT_GCO_OUTPUT_PATH if self._output_path is None else self._output_path
         self._size = DEFAULT_GCO_SIZE if self._size is None or self._size < 1 else self._size
@@ -232,6 +268,8 @@ class GoogleArtsCrawlerOption(object):
             print("==> url:{0}".format(self._url))
             print("==> webdriver_execute_path:{0}".format(os.path.abspath(self._webdriver_execute_path)))
             print("==> output :{0}".format(os.path.abspath(self._output_path)))
+            if self._asset_index_path is not None:
+                print("==> asset index :{0}".format(os.path.abspath(self._asset_index_path)))
 
         return self
 
@@ -323,6 +361,41 @@ class GoogleArtsCrawlerOption(object):
         self._need_clear_cache = need_clear_cache
         return self
 
+    @property
+    def asset_index_path(self) -> str:
+        return self._asset_index_path
+
+    def set_asset_index_path(self, asset_index_path: str):
+        self._asset_index_path = asset_index_path
+        return self
+
+    @property
+    def need_lean_load(self) -> bool:
+        return self._need_lean_load
+
+    def set_need_lean_load(self, need_lean_load: bool):
+        """
+        Must be called before `prepare_options`, which enables the performance log read by the lean load report.
+        """
+        self._need_lean_load = need_lean_load
+        return self
+
+    @property
+    def lean_load_blocked_urls(self) -> list:
+        return self._lean_load_blocked_urls
+
+    def set_lean_load_blocked_urls(self, lean_load_blocked_urls: list):
+        self._lean_load_blocked_urls = lean_load_blocked_urls
+        return self
+
+    @property
+    def need_embed_metadata(self) -> bool:
+        return self._need_embed_metadata
+
+    def set_need_embed_metadata(self, need_embed_metadata: bool):
+        self._need_embed_metadata = need_embed_metadata
+        return self
+
     @property
     def is_debug(self):
         return self._is_debug
@@ -345,19 +418,36 @@ class GoogleArtsCrawlerProcess(object):
 
         self._gaco = gaco
         print(os.path.abspath(self._gaco.webdriver_execute_path))
-        self._browser = webdriver.Chrome(options=self._gaco.chrome_options,
-                                         executable_path=self._gaco.webdriver_execute_path)
+        # browser is opened lazily, assets skipped by the asset index never launch chrome
+        self._browser = None
         self._local_partial_tmp = None
+        self._asset_id = None
+        if self._gaco.asset_index_path is not None:
+            self._asset_id = parse_asset_id(self._gaco.url)
 
     @property
     def gaco(self):
         return self._gaco
 
     def process(self):
-        self._generate_image()
+        if self._gaco.asset_index_path is None:
+            self._process()
+            return
+        with GoogleArtsAssetIndex(self._gaco.asset_index_path) as asset_index:
+            if not asset_index.need_download(self._asset_id, self._gaco.size):
+                print("==> asset {0} is up to date in asset index, skip".format(self._asset_id))
+                return
+            local_full_output_path = self._process()
+            with Image.open(local_full_output_path) as image:
+                width, height = image.size
+            asset_index.record(self._asset_id, self._gaco.url, self._gaco.size, local_full_output_path, width, height)
+
+    def _process(self) -> str:
+        local_full_output_path = self._generate_image()
         if self._gaco.need_clear_cache:
             self._cleanup()
             pass
+        return local_full_output_path
 
     # get blob content from blob:https://xxxxx
     def _get_blob_content(self, uri):
@@ -396,17 +486,63 @@ class GoogleArtsCrawlerProcess(object):
             im_grid.paste(im, (h_sizes[i % n_horiz], v_sizes[i // n_horiz]))
         return im_grid
 
+    def _enable_lean_load(self):
+        blocked_urls = self._gaco.lean_load_blocked_urls
+        if blocked_urls is None:
+            blocked_urls = list(DEFAULT_GCO_LEAN_LOAD_BLOCKED_URLS)
+        self._browser.execute_cdp_cmd('Network.enable', {})
+        self._browser.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+
+    def _report_lean_load(self):
+        """
+        Prints blocked requests and transferred bytes read from chrome performance log.
+        Blocked requests never reach the network so their size is unknown, compare `loaded bytes`
+        with a run without lean load to get bytes saved.
+        """
+        loaded_requests = 0
+        loaded_bytes = 0
+        blocked_urls = {}
+        requested_urls = {}
+        try:
+            performance_log = self._browser.get_log('performance')
+        except Exception as e:
+            # performance log is enabled by `prepare_options` only if lean load was set before it
+            print("==> lean load, performance log unavailable, skip report:{0}".format(e))
+            return
+        for entry in performance_log:
+            message = json.loads(entry['message'])['message']
+            params = message.get('params', {})
+            if message['method'] == 'Network.requestWillBeSent':
+                requested_urls[params['requestId']] = params['request']['url']
+            elif message['method'] == 'Network.loadingFinished':
+                loaded_requests += 1
+                loaded_bytes += int(params.get('encodedDataLength', 0))
+            elif message['method'] == 'Network.loadingFailed' and params.get('blockedReason') is not None:
+                blocked_urls[params['requestId']] = requested_urls.get(params['requestId'])
+        print("==> lean load, blocked requests:{0}, loaded requests:{1}, "
+              "loaded bytes (compare with a run without lean load):{2}".format(
+            len(blocked_urls), loaded_requests, loaded_bytes))
+        if self._gaco.is_debug:
+            for blocked_url in blocked_urls.values():
+                print("===> blocked:{0}".format(blocked_url))
+
     def _cleanup(self):
         if self._local_partial_tmp is not None:
             shutil.rmtree(self._local_partial_tmp)
 
     # 生成切片图，再组合成一张完整图片
-    def _generate_image(self):
+    def _generate_image(self) -> str:
+        self._browser = webdriver.Chrome(options=self._gaco.chrome_options,
+                                         executable_path=self._gaco.webdriver_execute_path)
         try:
+            if self._gaco.need_lean_load:
+                self._enable_lean_load()
             print("==> staring request:{0}".format(self._gaco.url))
             self._browser.get(self._gaco.url)
             if self._gaco.init_delay is not None and self._gaco.init_delay > 0:
                 time.sleep(self._gaco.init_delay)
+            if self._gaco.need_lean_load:
+                self._report_lean_load()
             blobs = self._browser.find_elements_by_tag_name('img')
             print("==> get total partial images:{0}".format(len(blobs) - 2))
             title = slugify(self._browser.title)
@@ -472,13 +608,27 @@ class GoogleArtsCrawlerProcess(object):
                 inverted_pil_images.append(pil_images[(i * rows) + j])
 
         grid = self._pil_grid(inverted_pil_images, columns)
-        local_full_output_path = os.path.join(self._gaco.output_path,
-                                              "{title}.jpg".format(title=title)
-                                              if self._gaco.output_filename is None else self._gaco.output_filename)
+        output_filename = "{title}.jpg".format(title=title) \
+            if self._gaco.output_filename is None else self._gaco.output_filename
+        if self._asset_id is not None:
+            # titles are not unique, indexed assets must not overwrite each other
+            output_name, output_ext = os.path.splitext(output_filename)
+            output_filename = "{0}-{1}{2}".format(output_name, self._asset_id, output_ext)
+        local_full_output_path = os.path.join(self._gaco.output_path, output_filename)
         grid.save(local_full_output_path)
         print("==>  Image location: {0}".format(local_full_output_path))
+        if self._gaco.need_embed_metadata:
+            # imported here, so `python -m api.metadata` is not imported twice through this package
+            from .metadata import fetch_asset_metadata, embed_xmp_metadata
+            try:
+                embed_xmp_metadata(local_full_output_path, fetch_asset_metadata(self._gaco.url))
+                print("==>  Metadata embedded as XMP")
+            except Exception as e:
+                # image is already saved, keep it and go on
+                print("==>  Metadata embedding failed:{0}".format(e))
         inverted_pil_images = None
         pil_images = None
+        return local_full_output_path
 
 
 from . import GoogleArtsCrawlerProcess, GoogleArtsCrawlerOption
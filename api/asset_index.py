@@ -0,0 +1,158 @@
+# -*- coding:utf-8 -*-
+
+"""
+ Local SQLite index of downloaded google arts assets.
+
+ Every asset is keyed by the id taken from its url
+ (`https://artsandculture.google.com/asset/madame-moitessier/hQFUe-elM1npbw` ==> `hQFUe-elM1npbw`),
+ so a re-run can decide whether an asset needs to be crawled again before opening a browser.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from urllib3.util.url import parse_url
+
+DEFAULT_GCO_ASSET_INDEX_PATH = 'output/index.sqlite'
+
+
+def parse_asset_id(url: str) -> str:
+    """
+    Parse asset id from google arts asset url.
+    :param url:     e.g. https://artsandculture.google.com/asset/madame-moitessier/hQFUe-elM1npbw
+    :return:        e.g. hQFUe-elM1npbw
+    """
+    path = parse_url(url=url).path or ''
+    segments = [segment for segment in path.split('/') if segment != '']
+    if len(segments) < 2 or segments[0] != 'asset':
+        raise Exception("parse_asset_id, url `{0}` is not an asset url!".format(url))
+    return segments[-1]
+
+
+def file_checksum(filename: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(filename, mode='rb') as fd:
+        while True:
+            data = fd.read(1024 * 1024)
+            if not data:
+                break
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+class GoogleArtsAssetIndex(object):
+    def __init__(self, index_path: str = DEFAULT_GCO_ASSET_INDEX_PATH):
+        """
+        GoogleArtsAssetIndex
+        Usage:
+        ```
+            with GoogleArtsAssetIndex("output/index.sqlite") as index:
+                asset_id = parse_asset_id(url)
+                if index.need_download(asset_id, size):
+                    ...
+                    index.record(asset_id, url, size, output_filename, width, height)
+        ```
+        :param index_path:  sqlite database file, created if not exist.
+        """
+        index_dir = os.path.dirname(index_path)
+        if index_dir and not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        self._index_path = index_path
+        self._conn = sqlite3.connect(index_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS assets (
+            asset_id    TEXT PRIMARY KEY,
+            url         TEXT NOT NULL,
+            size        INTEGER NOT NULL,
+            output_path TEXT NOT NULL,
+            checksum    TEXT NOT NULL,
+            created_at  REAL NOT NULL,
+            updated_at  REAL NOT NULL,
+            width       INTEGER,
+            height      INTEGER,
+            file_size   INTEGER,
+            mtime       REAL
+        )
+        """)
+        # index created before width, height, file_size and mtime were recorded
+        columns = [row['name'] for row in self._conn.execute("PRAGMA table_info(assets)")]
+        for column, column_type in (('width', 'INTEGER'), ('height', 'INTEGER'),
+                                    ('file_size', 'INTEGER'), ('mtime', 'REAL')):
+            if column not in columns:
+                self._conn.execute("ALTER TABLE assets ADD COLUMN {0} {1}".format(column, column_type))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS assets_output_path ON assets (output_path)")
+        self._conn.commit()
+
+    @property
+    def index_path(self) -> str:
+        return self._index_path
+
+    def get(self, asset_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT * FROM assets WHERE asset_id = ?", (asset_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def need_download(self, asset_id: str, size: int) -> bool:
+        """
+        An asset needs download if it is not indexed yet, was downloaded with a smaller size
+        and had not reached its native size, or its output file has been removed or replaced since.
+        """
+        asset = self.get(asset_id)
+        if asset is None:
+            return True
+        if asset['size'] < size and not self._reached_native_size(asset):
+            return True
+        return not self._is_output_unchanged(asset)
+
+    @staticmethod
+    def _reached_native_size(asset: dict) -> bool:
+        # the viewer fits image into `size` x `size`, a smaller image did not fill it and is native size
+        if asset['width'] is None or asset['height'] is None:
+            return False
+        return max(asset['width'], asset['height']) < asset['size']
+
+    @staticmethod
+    def _is_output_unchanged(asset: dict) -> bool:
+        output_path = asset['output_path']
+        if not os.path.isfile(output_path):
+            return False
+        stat = os.stat(output_path)
+        if stat.st_size == asset['file_size'] and stat.st_mtime == asset['mtime']:
+            return True
+        # size or mtime changed (or not recorded), only checksum tells if file was replaced
+        return file_checksum(output_path) == asset['checksum']
+
+    def record(self, asset_id: str, url: str, size: int, output_path: str, width: int, height: int):
+        """
+        :param size:            requested size.
+        :param output_path:     downloaded image file.
+        :param width:           downloaded image width in pixels.
+        :param height:          downloaded image height in pixels.
+        """
+        # absolute path, so lookups from another working directory still find the file
+        output_path = os.path.abspath(output_path)
+        stat = os.stat(output_path)
+        now = time.time()
+        asset = self.get(asset_id)
+        created_at = now if asset is None else asset['created_at']
+        # file has been overwritten, other assets written to the same path are gone
+        self._conn.execute("DELETE FROM assets WHERE output_path = ? AND asset_id != ?", (output_path, asset_id))
+        self._conn.execute("INSERT OR REPLACE INTO assets "
+                           "(asset_id, url, size, output_path, checksum, created_at, updated_at, "
+                           "width, height, file_size, mtime) "
+                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (asset_id, url, size, output_path, file_checksum(output_path), created_at, now,
+                            width, height, stat.st_size, stat.st_mtime))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,252 @@
+# -*- coding:utf-8 -*-
+
+"""
+ Metadata only crawler for google arts assets.
+
+ Asset metadata is read from the asset page html and the tile info (`{image base}=g`) xml,
+ no browser is launched and no tile is rendered, so many urls can be indexed concurrently.
+
+ Usage:
+    python -m api.metadata urls.txt --output metadata.jsonl --workers 16
+"""
+
+import html
+import json
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+import click
+from urllib3 import PoolManager, Timeout
+from urllib3.exceptions import HTTPError
+from urllib3.util.retry import Retry
+from urllib3.util.url import parse_url
+
+DEFAULT_GCO_METADATA_WORKERS = 8
+DEFAULT_GCO_METADATA_TIMEOUT = Timeout(connect=10, read=30)
+DEFAULT_GCO_METADATA_RETRIES = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504))
+DEFAULT_GCO_METADATA_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 " \
+                                  "(KHTML, like Gecko) Chrome/78.0.3904.70 Safari/537.36"
+
+# page details keys, first found wins
+_DETAILS_KEYS = {
+    'title': ('Title',),
+    'creator': ('Creator', 'Artist', 'Author'),
+    'date': ('Date Created', 'Date', 'Date created'),
+    'institution': ('Institution', 'Partner', 'Location'),
+    'rights': ('Rights', 'Copyright'),
+}
+
+_XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+
+
+def _strip_tags(value: str) -> str:
+    return html.unescape(re.sub(r'<[^>]+>', '', value)).strip()
+
+
+def _meta_property(page: str, name: str) -> Optional[str]:
+    # attributes may come in any order, e.g. `<meta content="..." property="og:image">`
+    for tag in re.findall(r'<meta\s[^>]*>', page):
+        attributes = dict((key.lower(), value) for key, value in re.findall(r'([\w:-]+)\s*=\s*"([^"]*)"', tag))
+        if name in (attributes.get('property'), attributes.get('name')) and 'content' in attributes:
+            return html.unescape(attributes['content'])
+    return None
+
+
+def _parse_details(page: str) -> dict:
+    """
+    Details section of asset page, e.g. `<li><span>Title:</span> Madame Moitessier</li>`.
+    """
+    details = {}
+    for key, value in re.findall(r'<li[^>]*><span[^>]*>([^<]+?):\s*</span>(.*?)</li>', page, re.S):
+        key = _strip_tags(key)
+        if key not in details:
+            details[key] = _strip_tags(value)
+    return details
+
+
+def _parse_tile_info(tile_info: bytes) -> dict:
+    """
+    Tile info xml, e.g.
+    `<TileInfo tile_width="512" tile_height="512" image_width="5436" image_height="4080" ...>
+        <pyramid_level num_tiles_x="1" num_tiles_y="1" empty_pels_x="398" empty_pels_y="454"/>
+        ...
+    </TileInfo>`
+    """
+    root = ElementTree.fromstring(tile_info)
+    tile_width = int(root.attrib['tile_width'])
+    tile_height = int(root.attrib['tile_height'])
+    pyramid_levels = []
+    for level in root.findall('pyramid_level'):
+        pyramid_levels.append({
+            'width': int(level.attrib['num_tiles_x']) * tile_width - int(level.attrib.get('empty_pels_x', 0)),
+            'height': int(level.attrib['num_tiles_y']) * tile_height - int(level.attrib.get('empty_pels_y', 0)),
+            'tiles_x': int(level.attrib['num_tiles_x']),
+            'tiles_y': int(level.attrib['num_tiles_y']),
+        })
+    return {
+        'width': int(root.attrib['image_width']),
+        'height': int(root.attrib['image_height']),
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'pyramid_levels': pyramid_levels,
+    }
+
+
+def _pool_manager(maxsize: int = 1) -> PoolManager:
+    # without timeout a stalled connection blocks a worker forever
+    return PoolManager(maxsize=maxsize, timeout=DEFAULT_GCO_METADATA_TIMEOUT, retries=DEFAULT_GCO_METADATA_RETRIES)
+
+
+def fetch_asset_metadata(url: str, http: PoolManager = None) -> dict:
+    """
+    Fetch metadata of google arts asset without rendering it.
+    :param url:     google arts asset url.
+    :param http:    shared PoolManager, a new one with default timeout and retries is created if not set.
+    :return:        dict with url, title, creator, date, institution, rights, width, height, pyramid_levels,
+                    tile_info_error, details. `tile_info_error` is None if width, height and pyramid_levels were fetched.
+    """
+    uprs = parse_url(url=url)
+    if not uprs.host == 'artsandculture.google.com':
+        raise Exception("fetch_asset_metadata, url netloc is not `artsandculture.google.com`")
+    url = "https://{0}{1}".format(uprs.host, uprs.path)
+    http = _pool_manager() if http is None else http
+    headers = {'User-Agent': DEFAULT_GCO_METADATA_USER_AGENT}
+
+    response = http.request('GET', url, headers=headers)
+    if response.status != 200:
+        raise Exception("fetch_asset_metadata, request {0} failed with status {1}".format(url, response.status))
+    page = response.data.decode('utf-8', errors='replace')
+
+    details = _parse_details(page)
+    metadata = {'url': url}
+    for field, keys in _DETAILS_KEYS.items():
+        metadata[field] = next((details[key] for key in keys if key in details), None)
+    if metadata['title'] is None:
+        title = _meta_property(page, 'og:title')
+        metadata['title'] = None if title is None else title.split(' - ')[0].strip()
+
+    metadata['width'] = None
+    metadata['height'] = None
+    metadata['pyramid_levels'] = None
+    metadata['tile_info_error'] = None
+    image = _meta_property(page, 'og:image')
+    if image is None:
+        metadata['tile_info_error'] = "og:image not found"
+    else:
+        # `https://lh3.googleusercontent.com/ci/xxx=w1200-h630-p` ==> `https://lh3.googleusercontent.com/ci/xxx=g`
+        tile_info_url = "{0}=g".format(image.split('=')[0])
+        # tile info is optional, page metadata is kept and the failure is reported in `tile_info_error`
+        try:
+            response = http.request('GET', tile_info_url, headers=headers)
+            if response.status != 200:
+                metadata['tile_info_error'] = "request {0} failed with status {1}".format(tile_info_url, response.status)
+            else:
+                tile_info = _parse_tile_info(response.data)
+                metadata['width'] = tile_info['width']
+                metadata['height'] = tile_info['height']
+                metadata['pyramid_levels'] = tile_info['pyramid_levels']
+        except (HTTPError, ElementTree.ParseError, KeyError, ValueError) as e:
+            metadata['tile_info_error'] = "tile info {0} failed with {1}: {2}".format(tile_info_url, type(e).__name__, e)
+    metadata['details'] = details
+    return metadata
+
+
+def fetch_assets_metadata(urls: List[str], workers: int = DEFAULT_GCO_METADATA_WORKERS) -> Iterator[dict]:
+    """
+    Fetch metadata of many assets concurrently, results are yielded in `urls` order.
+    A failed asset yields `{"url": url, "error": message}` instead of stopping the others.
+    """
+    http = _pool_manager(maxsize=workers)
+
+    def fetch(url):
+        try:
+            return fetch_asset_metadata(url, http=http)
+        except Exception as e:
+            return {'url': url, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for metadata in executor.map(fetch, urls):
+            yield metadata
+
+
+def embed_xmp_metadata(filename: str, metadata: dict):
+    """
+    Embed metadata as XMP (dublin core) into jpeg file written by crawler.
+    """
+    with open(filename, mode='rb') as fd:
+        content = fd.read()
+    if content[:2] != b'\xff\xd8':
+        raise Exception("embed_xmp_metadata, {0} is not a jpeg file!".format(filename))
+
+    xmp = ('<?xpacket begin="\ufeff" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+           '<x:xmpmeta xmlns:x="adobe:ns:meta/">'
+           '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+           '<rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+           '{title}{creator}{date}{publisher}{rights}{source}'
+           '</rdf:Description>'
+           '</rdf:RDF>'
+           '</x:xmpmeta>'
+           '<?xpacket end="w"?>').format(
+        title='' if metadata.get('title') is None else
+        '<dc:title><rdf:Alt><rdf:li xml:lang="x-default">{0}</rdf:li></rdf:Alt></dc:title>'.format(
+            html.escape(metadata['title'], quote=False)),
+        creator='' if metadata.get('creator') is None else
+        '<dc:creator><rdf:Seq><rdf:li>{0}</rdf:li></rdf:Seq></dc:creator>'.format(
+            html.escape(metadata['creator'], quote=False)),
+        date='' if metadata.get('date') is None else
+        '<dc:date><rdf:Seq><rdf:li>{0}</rdf:li></rdf:Seq></dc:date>'.format(
+            html.escape(metadata['date'], quote=False)),
+        publisher='' if metadata.get('institution') is None else
+        '<dc:publisher><rdf:Bag><rdf:li>{0}</rdf:li></rdf:Bag></dc:publisher>'.format(
+            html.escape(metadata['institution'], quote=False)),
+        rights='' if metadata.get('rights') is None else
+        '<dc:rights><rdf:Alt><rdf:li xml:lang="x-default">{0}</rdf:li></rdf:Alt></dc:rights>'.format(
+            html.escape(metadata['rights'], quote=False)),
+        source='' if metadata.get('url') is None else
+        '<dc:source>{0}</dc:source>'.format(html.escape(metadata['url'], quote=False)))
+    payload = _XMP_HEADER + xmp.encode('utf-8')
+    if len(payload) + 2 > 0xffff:
+        raise Exception("embed_xmp_metadata, metadata of {0} is too large!".format(filename))
+    segment = b'\xff\xe1' + (len(payload) + 2).to_bytes(2, 'big') + payload
+
+    # keep JFIF APP0 segment first
+    offset = 2
+    if content[2:4] == b'\xff\xe0':
+        offset = 4 + int.from_bytes(content[4:6], 'big')
+    with open(filename, mode='wb') as fd:
+        fd.write(content[:offset] + segment + content[offset:])
+
+
+@click.command()
+@click.argument("urls_file", type=click.File('r'))
+@click.option(
+    "--output",
+    type=click.File('w'),
+    default='-',
+    help="JSON Lines output file (default is stdout)."
+)
+@click.option(
+    "--workers",
+    default=DEFAULT_GCO_METADATA_WORKERS,
+    help="Number of concurrent requests (default is 8)."
+)
+def main(urls_file, output, workers):
+    urls = [line.strip() for line in urls_file if line.strip()]
+    failed = 0
+    tile_info_failed = 0
+    for metadata in fetch_assets_metadata(urls, workers=workers):
+        if 'error' in metadata:
+            failed += 1
+        elif metadata['tile_info_error'] is not None:
+            tile_info_failed += 1
+        output.write(json.dumps(metadata, ensure_ascii=False) + '\n')
+        output.flush()
+    print("==> metadata fetched:{0}, failed:{1}, without tile info:{2}".format(
+        len(urls) - failed - tile_info_failed, failed, tile_info_failed), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
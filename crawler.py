@@ -12,6 +12,9 @@ from selenium import webdriver
 from PIL import Image
 from slugify import slugify
 
+from api.asset_index import GoogleArtsAssetIndex, parse_asset_id
+from api.metadata import fetch_asset_metadata, embed_xmp_metadata
+
 DEFAULT_SIZE = 12000
 DEFAULT_HOST = 'artsandculture.google.com'
 
@@ -30,14 +33,36 @@ DEFAULT_HOST = 'artsandculture.google.com'
     is_flag=True,
     help="Raise errors instead of just printing them. Useful for debugging."
 )
-def main(url, size, raise_errors):
+@click.option(
+    "--index",
+    default=None,
+    help="SQLite asset index e.g. output/index.sqlite. Images already downloaded with size >= --size are skipped."
+)
+@click.option(
+    "--embed-metadata",
+    is_flag=True,
+    help="Embed title, creator, date, institution and rights of the image as XMP."
+)
+def main(url, size, raise_errors, index, embed_metadata):
     try:
         cleanup()
         url = pyperclip.paste()
         if not DEFAULT_HOST in url:
             url, size = get_user_input()
-        print("> Opening website")
-        generate_image(url, size, raise_errors)
+        if index:
+            asset_id = parse_asset_id(url)
+            with GoogleArtsAssetIndex(index) as asset_index:
+                if not asset_index.need_download(asset_id, size):
+                    print("> SKIPPED! Image already downloaded: {0}".format(asset_index.get(asset_id)['output_path']))
+                    return
+                print("> Opening website")
+                output_filename = generate_image(url, size, raise_errors, embed_metadata=embed_metadata)
+                with Image.open(output_filename) as image:
+                    width, height = image.size
+                asset_index.record(asset_id, url, size, output_filename, width, height)
+        else:
+            print("> Opening website")
+            generate_image(url, size, raise_errors, embed_metadata=embed_metadata)
         cleanup()
     except Exception as e:
         print("FAILED")
@@ -64,7 +89,7 @@ def get_user_input():
     print("=====================================")
     return url, size
 
-def generate_image(url, size, raise_errors, delay=5):
+def generate_image(url, size, raise_errors, delay=5, embed_metadata=False):
     mobile_emulation = {
         "deviceMetrics": {"width": size, "height": size, "pixelRatio": 1.0},
         "userAgent": "Mozilla/5.0 (Linux; Android 4.2.1; en-us; Nexus 5 Build/JOP40D) AppleWebKit/535.19 (KHTML, like Gecko) Chrome/18.0.1025.166 Mobile Safari/535.19"}
@@ -120,7 +145,7 @@ def generate_image(url, size, raise_errors, delay=5):
                     raise e
                 print(str(e))
                 print('Trying again...')
-                generate_image(url, size, raise_errors, delay+10)
+                generate_image(url, size, raise_errors, delay+10, embed_metadata)
 
         i += 1
 
@@ -138,9 +163,18 @@ def generate_image(url, size, raise_errors, delay=5):
 
     print("> Saving partial images as final image")
     grid = pil_grid(inverted_pil_images, columns)
-    grid.save('output/' + title + '-' + url[-14:] + '.jpg')
-    print("> SUCCESS! Image location: output/{0}.jpg".format(title + '-' + url[-14:]))
+    output_filename = 'output/' + title + '-' + url[-14:] + '.jpg'
+    grid.save(output_filename)
+    print("> SUCCESS! Image location: {0}".format(output_filename))
+    if embed_metadata:
+        try:
+            embed_xmp_metadata(output_filename, fetch_asset_metadata(url))
+            print("> Metadata embedded as XMP")
+        except Exception as e:
+            # image is already saved, keep it
+            print("> Metadata embedding failed: {0}".format(e))
     browser.close()
+    return output_filename
 
 def get_file_content_chrome(driver, uri):
     """
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from api.asset_index import GoogleArtsAssetIndex, parse_asset_id
+
+URL = "https://artsandculture.google.com/asset/madame-moitessier/hQFUe-elM1npbw"
+
+
+@pytest.fixture
+def index(tmp_path):
+    with GoogleArtsAssetIndex(str(tmp_path / "index.sqlite")) as index:
+        yield index
+
+
+def write(path, content=b'image'):
+    with open(str(path), mode='wb') as fd:
+        fd.write(content)
+    return str(path)
+
+
+def test_parse_asset_id():
+    assert parse_asset_id(URL) == 'hQFUe-elM1npbw'
+    assert parse_asset_id("https://artsandculture.google.com/asset/hQFUe-elM1npbw/") == 'hQFUe-elM1npbw'
+    with pytest.raises(Exception):
+        parse_asset_id("https://artsandculture.google.com/story/hQFUe-elM1npbw")
+
+
+def test_need_download_until_recorded(index, tmp_path):
+    assert index.need_download('a', 1000)
+    index.record('a', URL, 1000, write(tmp_path / 'a.jpg'), 1000, 800)
+    assert not index.need_download('a', 1000)
+    assert not index.need_download('a', 500)
+
+
+def test_record_stores_absolute_path(index, tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    write(tmp_path / 'a.jpg')
+    index.record('a', URL, 1000, 'a.jpg', 1000, 800)
+    assert index.get('a')['output_path'] == os.path.abspath('a.jpg')
+    monkeypatch.chdir('/')
+    assert not index.need_download('a', 1000)
+
+
+def test_upgrade_unless_native_size(index, tmp_path):
+    index.record('a', URL, 1000, write(tmp_path / 'a.jpg'), 1000, 800)
+    assert index.need_download('a', 2000)
+    # image smaller than requested size did not fill the viewport, it is native size already
+    index.record('b', URL, 1000, write(tmp_path / 'b.jpg'), 600, 400)
+    assert not index.need_download('b', 2000)
+
+
+def test_removed_or_replaced_file(index, tmp_path):
+    index.record('a', URL, 1000, write(tmp_path / 'a.jpg'), 1000, 800)
+    write(tmp_path / 'a.jpg', b'another image')
+    assert index.need_download('a', 1000)
+    os.remove(str(tmp_path / 'a.jpg'))
+    assert index.need_download('a', 1000)
+
+
+def test_touched_file_with_same_content(index, tmp_path):
+    filename = write(tmp_path / 'a.jpg')
+    index.record('a', URL, 1000, filename, 1000, 800)
+    os.utime(filename, (0, 0))
+    assert not index.need_download('a', 1000)
+
+
+def test_record_same_output_path_invalidates_other_asset(index, tmp_path):
+    index.record('a', URL, 1000, write(tmp_path / 'same.jpg', b'a'), 1000, 800)
+    index.record('b', URL, 1000, write(tmp_path / 'same.jpg', b'b'), 1000, 800)
+    assert index.get('a') is None
+    assert index.need_download('a', 1000)
+    assert not index.need_download('b', 1000)
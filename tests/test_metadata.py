@@ -0,0 +1,101 @@
+import os
+
+import pytest
+from PIL import Image
+
+from api.metadata import _meta_property, _parse_details, _parse_tile_info, embed_xmp_metadata, fetch_asset_metadata
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+URL = "https://artsandculture.google.com/asset/madame-moitessier/hQFUe-elM1npbw"
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), mode='rb') as fd:
+        return fd.read()
+
+
+class Response(object):
+    def __init__(self, status, data=b''):
+        self.status = status
+        self.data = data
+
+
+class Http(object):
+    def __init__(self, tile_info):
+        self._tile_info = tile_info
+
+    def request(self, method, url, headers=None):
+        if url == URL:
+            return Response(200, fixture('asset_page.html'))
+        if url == "https://lh3.googleusercontent.com/ci/AC_hQFUe-elM1npbw=g":
+            return self._tile_info
+        return Response(404)
+
+
+def test_meta_property_any_attribute_order():
+    page = fixture('asset_page.html').decode('utf-8')
+    assert _meta_property(page, 'og:image') == "https://lh3.googleusercontent.com/ci/AC_hQFUe-elM1npbw=w1200-h630-p"
+    assert _meta_property(page, 'description') == "Ingres's portrait of Madame Moitessier"
+    assert _meta_property(page, 'og:description') is None
+
+
+def test_parse_details():
+    details = _parse_details(fixture('asset_page.html').decode('utf-8'))
+    assert details['Title'] == "Madame Moitessier"
+    assert details['Creator'] == "Jean-Auguste-Dominique Ingres"
+    assert details['Date Created'] == "1856"
+    assert details['Rights'] == "© The National Gallery, London"
+
+
+def test_parse_tile_info():
+    tile_info = _parse_tile_info(fixture('tile_info.xml'))
+    assert (tile_info['width'], tile_info['height']) == (5436, 4080)
+    assert len(tile_info['pyramid_levels']) == 5
+    assert tile_info['pyramid_levels'][0] == {'width': 340, 'height': 255, 'tiles_x': 1, 'tiles_y': 1}
+    assert tile_info['pyramid_levels'][-1] == {'width': 5436, 'height': 4080, 'tiles_x': 11, 'tiles_y': 8}
+
+
+def test_fetch_asset_metadata():
+    metadata = fetch_asset_metadata(URL, http=Http(Response(200, fixture('tile_info.xml'))))
+    assert metadata['title'] == "Madame Moitessier"
+    assert metadata['creator'] == "Jean-Auguste-Dominique Ingres"
+    assert metadata['date'] == "1856"
+    assert metadata['institution'] == "The National Gallery, London"
+    assert (metadata['width'], metadata['height']) == (5436, 4080)
+    assert metadata['tile_info_error'] is None
+
+
+@pytest.mark.parametrize('tile_info', [Response(404), Response(200, b'<TileInfo'), Response(200, b'<TileInfo/>')])
+def test_fetch_asset_metadata_reports_tile_info_error(tile_info):
+    metadata = fetch_asset_metadata(URL, http=Http(tile_info))
+    assert metadata['title'] == "Madame Moitessier"
+    assert metadata['width'] is None and metadata['pyramid_levels'] is None
+    assert metadata['tile_info_error'] is not None
+
+
+def test_embed_xmp_metadata(tmp_path):
+    filename = str(tmp_path / 'image.jpg')
+    Image.new('RGB', (64, 48), color='red').save(filename)
+    embed_xmp_metadata(filename, {'title': 'Madame <Moitessier>', 'creator': 'Ingres', 'url': URL})
+
+    with open(filename, mode='rb') as fd:
+        content = fd.read()
+    # JFIF APP0 stays first, XMP APP1 follows it
+    assert content[2:4] == b'\xff\xe0'
+    app1 = 4 + int.from_bytes(content[4:6], 'big')
+    assert content[app1:app1 + 2] == b'\xff\xe1'
+    assert content[app1 + 4:app1 + 4 + 29] == b'http://ns.adobe.com/xap/1.0/\x00'
+
+    with Image.open(filename) as image:
+        image.load()
+        assert image.size == (64, 48)
+        xmp = image.info['xmp']
+    assert b'Madame &lt;Moitessier&gt;' in xmp
+    assert b'<dc:source>' + URL.encode() + b'</dc:source>' in xmp
+
+
+def test_embed_xmp_metadata_not_jpeg(tmp_path):
+    filename = str(tmp_path / 'image.png')
+    Image.new('RGB', (8, 8)).save(filename)
+    with pytest.raises(Exception):
+        embed_xmp_metadata(filename, {'title': 'Madame Moitessier'})